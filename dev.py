@@ -9,13 +9,20 @@ from aiohttp import web
 DEV_SERVER_HOST = "127.0.0.1"
 DEV_SERVER_PORT = 8000
 
-loop = asyncio.new_event_loop()
-
 app = web.Application()
 routes = web.RouteTableDef()
 
 
-from src import Client, Config, InterceptHandler, Logging, WebSocketConnectionConfig, WebSocketService
+from src import (
+    Client,
+    Config,
+    InterceptHandler,
+    Logging,
+    WebSocketConnectionConfig,
+    WebSocketService,
+    install_uvloop,
+    use_mplcairo,
+)
 
 config = Config()
 logger = Logging(
@@ -29,6 +36,12 @@ logging.basicConfig(
     force=True,
 )
 
+if config.get("use-uvloop", True) and install_uvloop():
+    logger.debug("Using uvloop as the event loop")
+if config.get("use-mplcairo", False) and use_mplcairo():
+    logger.debug("Using mplcairo to render the maps")
+loop = asyncio.new_event_loop()
+
 key = os.getenv("API_KEY")
 if key:
     logger.info("API_KEY found, using WebSocket Client")
@@ -7,7 +7,16 @@ load_dotenv(override=True)
 
 
 def main():
-    from src import Client, Config, InterceptHandler, Logging, WebSocketConnectionConfig, WebSocketService
+    from src import (
+        Client,
+        Config,
+        InterceptHandler,
+        Logging,
+        WebSocketConnectionConfig,
+        WebSocketService,
+        install_uvloop,
+        use_mplcairo,
+    )
 
     config = Config()
     logger = Logging(
@@ -21,6 +30,11 @@ def main():
         force=True,
     )
 
+    if config.get("use-uvloop", True) and install_uvloop():
+        logger.debug("Using uvloop as the event loop")
+    if config.get("use-mplcairo", False) and use_mplcairo():
+        logger.debug("Using mplcairo to render the maps")
+
     key = os.getenv("API_KEY")
     if key:
         logger.info("API_KEY found, using WebSocket Client")
@@ -126,8 +126,9 @@ class DiscordNotification(BaseNotificationClient, discord.Bot):
             self.update_eew_messages_loop.stop()
             return
         now_time = int(datetime.now().timestamp())
+        create_task = self.loop.create_task
         for m in list(self.alerts.values()):
             if now_time > m._lift_time:
-                self.loop.create_task(self.lift_eew(m.eew))
+                create_task(self.lift_eew(m.eew))
             else:
-                self.loop.create_task(m.edit())
+                create_task(m.edit())
@@ -206,7 +206,7 @@ class EEWMessages:
                 file = {}
             else:
                 eq.map.draw_wave(current_time - eq.time.timestamp() + self.get_latency())
-                file = {"file": discord.File(eq.map.save(), "image.png")}
+                file = {"file": discord.File(await eq.map.save_async(), "image.png")}
 
             self._last_update = datetime.now().timestamp()
             self._map_update_interval = max(self._last_update - current_time, self._map_update_interval)
@@ -3,7 +3,7 @@ import os
 
 import aiohttp
 
-from src import EEW, BaseNotificationClient, Config, Logger
+from src import EEW, BaseNotificationClient, Config, Logger, json_dumps
 
 LINE_API_NODE = "https://api.line.me/v2"
 
@@ -169,7 +169,7 @@ class LineNotification(BaseNotificationClient):
 
         headers = {"Content-Type": "application/json", "Authorization": f"Bearer {self.__access_token}"}
         msg = self._flex_message(eew)
-        async with aiohttp.ClientSession(headers=headers) as session:
+        async with aiohttp.ClientSession(headers=headers, json_serialize=json_dumps) as session:
             await asyncio.gather(
                 *(self._send_message(session, channel_id, msg) for channel_id in self.notification_channels)
             )
@@ -189,7 +189,7 @@ class LineNotification(BaseNotificationClient):
 
         headers = {"Content-Type": "application/json", "Authorization": f"Bearer {self.__access_token}"}
         msg = self._flex_message(eew, is_update=True)
-        async with aiohttp.ClientSession(headers=headers) as session:
+        async with aiohttp.ClientSession(headers=headers, json_serialize=json_dumps) as session:
             await asyncio.gather(
                 *(self._send_message(session, channel_id, msg) for channel_id in self.notification_channels)
             )
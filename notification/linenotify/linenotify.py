@@ -63,8 +63,8 @@ class LineNotifyClient(BaseNotificationClient):
     async def _send_region_intensity(self, eew: EEW):
         # 發送各地震度和抵達時間並排版
         eq = eew.earthquake
-        await eq._intensity_calculated.wait()
-        if eq._intensity_calculated.is_set():
+        await eq.wait_until_intensity_calculated()
+        if eq.city_max_intensity is not None:
             region_intensity = await self.get_region_intensity(eew)
             current_time = int(datetime.now().timestamp())
             region_intensity_message = f"\n🚨第{eew.serial}報🚨\n⚠️以下僅供參考⚠️\n預估震度|抵達時間:"
@@ -93,7 +93,7 @@ class LineNotifyClient(BaseNotificationClient):
             await eq._calc_task
             if eq.map._drawn:
                 message += img_msg
-                image = eq.map.save().getvalue()
+                image = (await eq.map.save_async()).getvalue()
                 __headers = {"Authorization": f"Bearer {self._notify_token}"}
                 async with aiohttp.ClientSession(headers=__headers) as session:
                     await self._post_line_api(session, msg=message, img=image)
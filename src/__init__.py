@@ -26,7 +26,7 @@ from .earthquake.location import (
     Location,
     RegionLocation,
 )
-from .earthquake.map import Map
+from .earthquake.map import Map, use_mplcairo
 from .earthquake.model import (
     Distance,
     Intensity,
@@ -39,4 +39,4 @@ from .earthquake.model import (
 )
 from .logging import InterceptHandler, Logger, Logging
 from .notification.base import BaseNotificationClient
-from .utils import MISSING
+from .utils import MISSING, install_uvloop, json_dumps, json_loads
@@ -1,8 +1,8 @@
 import asyncio
 import importlib
 import os
+import random
 import re
-from collections import defaultdict
 from typing import Any, Optional
 
 import aiohttp
@@ -21,6 +21,34 @@ from .websocket import (
     WebSocketReconnect,
 )
 
+EEW_REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=1, sock_connect=0.5, sock_read=0.5)
+"Timeout of polling EEW data, a stalled node is skipped instead of delaying the alerts"
+MAX_RECONNECT_DELAY = 60
+"Upper bound of the websocket reconnect backoff in seconds"
+
+NEW_ALERT_LOG = (
+    "New EEW alert is detected!\n"
+    "--------------------------------\n"
+    "       ID: {} (Serial {})\n"
+    " Location: {}({}, {})\n"
+    "Magnitude: {}\n"
+    "    Depth: {}km\n"
+    "     Time: {:%Y/%m/%d %H:%M:%S}\n"
+    "--------------------------------"
+)
+"Log template of a new alert, formatted by the logger only when the record is emitted"
+UPDATE_ALERT_LOG = (
+    "EEW alert updated\n"
+    "--------------------------------\n"
+    "       ID: {} (Serial {})\n"
+    " Location: {}({:.2f}, {:.2f})\n"
+    "Magnitude: {}\n"
+    "    Depth: {}km\n"
+    "     Time: {:%Y/%m/%d %H:%M:%S}\n"
+    "--------------------------------"
+)
+"Log template of an updated alert, formatted by the logger only when the record is emitted"
+
 
 class Client:
     """A client for interacting with ExpTech API."""
@@ -35,7 +63,8 @@ class Client:
     _http: HTTPClient
     _ws: Optional[ExpTechWebSocket]
     websocket_config: WebSocketConnectionConfig
-    event_handlers: defaultdict[str, list]
+    event_handlers: dict[str, tuple[tuple[Any, asyncio.Queue], ...]]
+    _listener_tasks: list[asyncio.Task]
     __ready: asyncio.Event
     _reconnect = True
     __closed = False
@@ -63,46 +92,49 @@ class Client:
             None if eew_source.get("all") else [source for source, enable in eew_source.items() if enable]
         )
         self.notification_client = []
-        self.event_handlers = defaultdict(list)
+        self.event_handlers = {}
+        self._listener_tasks = []
         self.__ready = asyncio.Event()
 
     async def new_alert(self, data: dict):
         """Send a new EEW alert"""
-        eew = EEW.from_dict(data)
+        # building the wave model for an unseen depth runs TauP, keep it off the event loop
+        eew = await self._loop.run_in_executor(None, EEW.from_dict, data)
         self.alerts[eew.id] = eew
 
         self.logger.info(
-            "New EEW alert is detected!\n"
-            "--------------------------------\n"
-            f"       ID: {eew.id} (Serial {eew.serial})\n"
-            f" Location: {eew.earthquake.location.display_name}({eew.earthquake.lon}, {eew.earthquake.lat})\n"
-            f"Magnitude: {eew.earthquake.mag}\n"
-            f"    Depth: {eew.earthquake.depth}km\n"
-            f"     Time: {eew.earthquake.time.strftime('%Y/%m/%d %H:%M:%S')}\n"
-            "--------------------------------"
+            NEW_ALERT_LOG,
+            eew.id,
+            eew.serial,
+            eew.earthquake.location.display_name,
+            eew.earthquake.lon,
+            eew.earthquake.lat,
+            eew.earthquake.mag,
+            eew.earthquake.depth,
+            eew.earthquake.time,
         )
 
         eew.earthquake.calc_all_data_in_executor(self._loop)
 
         # call custom notification client
-        for client in self.notification_client:
-            self._loop.create_task(client.send_eew(eew))
+        self._loop.create_task(self._notify("send_eew", eew))
 
     async def update_alert(self, data: dict):
         """Update an existing EEW alert"""
-        eew = EEW.from_dict(data)
+        eew = await self._loop.run_in_executor(None, EEW.from_dict, data)
         old_eew = self.alerts.get(eew.id)
         self.alerts[eew.id] = eew
 
         self.logger.info(
-            "EEW alert updated\n"
-            "--------------------------------\n"
-            f"       ID: {eew.id} (Serial {eew.serial})\n"
-            f" Location: {eew.earthquake.location.display_name}({eew.earthquake.lon:.2f}, {eew.earthquake.lat:.2f})\n"
-            f"Magnitude: {eew.earthquake.mag}\n"
-            f"    Depth: {eew.earthquake.depth}km\n"
-            f"     Time: {eew.earthquake.time.strftime('%Y/%m/%d %H:%M:%S')}\n"
-            "--------------------------------"
+            UPDATE_ALERT_LOG,
+            eew.id,
+            eew.serial,
+            eew.earthquake.location.display_name,
+            eew.earthquake.lon,
+            eew.earthquake.lat,
+            eew.earthquake.mag,
+            eew.earthquake.depth,
+            eew.earthquake.time,
         )
 
         if old_eew is not None:
@@ -110,16 +142,50 @@ class Client:
         eew.earthquake.calc_all_data_in_executor(self._loop)
 
         # call custom notification client
-        for client in self.notification_client:
-            self._loop.create_task(client.update_eew(eew))
+        self._loop.create_task(self._notify("update_eew", eew))
+
+    async def _notify(self, method: str, eew: EEW):
+        """Call the method of all notification clients concurrently"""
+        if len(self.notification_client) == 1:
+            client = self.notification_client[0]
+            try:
+                await getattr(client, method)(eew)
+            except Exception:
+                self.logger.exception(f"Notification client '{type(client).__name__}' failed to {method}")
+            return
+        results = await asyncio.gather(
+            *(getattr(client, method)(eew) for client in self.notification_client), return_exceptions=True
+        )
+        for client, result in zip(self.notification_client, results):
+            if isinstance(result, Exception):
+                # not inside of an except block, so the exception is passed to loguru explicitly
+                self.logger.opt(exception=result).error(
+                    f"Notification client '{type(client).__name__}' failed to {method}"
+                )
 
     async def _emit(self, event: str, *args):
-        for handler in self.event_handlers[event]:
-            self._loop.create_task(handler(*args))
+        handlers = self.event_handlers.get(event)
+        if not handlers:
+            return
+        # hand the event over to the listener workers, no task is created per event
+        for _, queue in handlers:
+            queue.put_nowait(args)
+
+    async def _listener_worker(self, event: str, handler: Any, queue: asyncio.Queue):
+        """Call the handler with the emitted events one by one, in the order they were emitted"""
+        while True:
+            args = await queue.get()
+            try:
+                await handler(*args)
+            except Exception as e:
+                self.logger.exception(f"Error in '{event}' event handler", exc_info=e)
 
     def add_listener(self, event: WebSocketEvent, handler: Any):
         """Add a listener for a specific event"""
-        self.event_handlers[event].append(handler)
+        queue = asyncio.Queue()
+        # handlers are kept in tuples, emitting never has to guard against a listener being added meanwhile
+        self.event_handlers[event] = self.event_handlers.get(event, ()) + ((handler, queue),)
+        self._listener_tasks.append(self._loop.create_task(self._listener_worker(event, handler, queue)))
         return self
 
     async def on_eew(self, data: dict):
@@ -129,7 +195,7 @@ class Client:
             # source is list: only specified source
             return
 
-        self.alerts.expire()
+        # TTLCache already drops expired items on access, no need to sweep it on every frame
         eew = self.alerts.get(data["id"])
         if eew is None:
             await self.new_alert(data)
@@ -174,59 +240,71 @@ class Client:
                     task.cancel()
                 in_reconnect = False
                 _reconnect_delay = 0
+                pool_event = self._ws.pool_event
                 while True:
-                    await self._ws.pool_event()
+                    await pool_event()
             except AuthorizationFailed:
-                await self.close()
+                # only drop the websocket, the HTTP session is still needed for polling
+                if self._ws:
+                    await self._ws.close()
                 self.logger.warning("Authorization failed, switching to HTTP client")
                 self.websocket_config = None
                 await self.connect()
                 return
             except WebSocketReconnect as e:
-                if e.reopen and self._ws and not self._ws.closed:
+                if e.reopen and self._ws is not None:
+                    # closing an already closed websocket is a no-op, drop it so the next round reconnects
                     await self._ws.close()
-                self.logger.exception(f"Attempting a reconnect in {_reconnect_delay}s: {e.reason}")
+                    self._ws = None
+                self.logger.exception(f"Attempting a reconnect: {e.reason}")
             except Exception as e:
-                self.logger.exception(
-                    f"An unhandleable error occurred, reconnecting in {_reconnect_delay}s", exc_info=e
-                )
+                self.logger.exception("An unhandleable error occurred, reconnecting", exc_info=e)
             # use http client while reconnecting
             if not task or task.done():
                 task = self._loop.create_task(self._get_eew_loop())
             in_reconnect = True
-            if _reconnect_delay < 600:  # max reconnect delay 10min
-                _reconnect_delay += 10
-            await asyncio.sleep(_reconnect_delay)
+            # exponential backoff with jitter, so clients don't all reconnect at the same moment
+            _reconnect_delay = min(MAX_RECONNECT_DELAY, max(1, _reconnect_delay * 2))
+            delay = _reconnect_delay * (0.5 + random.random() * 0.5)
+            self.logger.info(f"Reconnecting to WebSocket in {delay:.1f}s")
+            await asyncio.sleep(delay)
             self._http.switch_ws_node()
 
     async def get_eew(self):
         try:
-            data: list[dict] = await self._http.get("/eq/eew")
+            data: list[dict] = await self._http.get("/eq/eew", timeout=EEW_REQUEST_TIMEOUT)
         except Exception as e:
             self.logger.exception("Fail to get eew data.", exc_info=e)
             return
 
+        # go through the eew listener queue like websocket data, so polling is never held up by an alert
         for d in data:
-            await self.on_eew(d)
+            await self._emit(WebSocketEvent.EEW.value, d)
 
     async def _get_eew_loop(self):
         self.logger.info("ExpTech HTTP client is ready")
         self.__ready.set()
-        task: asyncio.Task = None
+        # schedule on fixed ticks so the request duration doesn't delay the next poll
+        next_tick = self._loop.time()
         while True:
             try:
-                if not task or task.done():
-                    task = self._loop.create_task(self.get_eew())
-                await asyncio.sleep(0.5)
+                await self.get_eew()
+                now = self._loop.time()
+                # skip missed ticks instead of polling in a burst to catch up
+                next_tick = max(next_tick + 0.5, now)
+                await asyncio.sleep(next_tick - now)
             except asyncio.CancelledError:
                 return
 
     async def close(self):
-        """Close the websocket"""
+        """Close the websocket and the HTTP session (if it was created by the client)"""
         self._reconnect = False
         self.__closed = True
+        for task in self._listener_tasks:
+            task.cancel()
         if self._ws:
             await self._ws.close()
+        await self._http.close()
 
     def closed(self):
         """Whether the websocket is closed"""
@@ -237,6 +315,9 @@ class Client:
         Start the client.
         Note: This coro won't finish forever until user interrupt it.
         """
+        # the HTTP session is bound to the loop given at init, pass `loop` to run the client on another one
+        if asyncio.get_running_loop() is not self._loop:
+            raise RuntimeError("Client must be started on the event loop it was created with.")
         self.logger.info("Starting ExpTech API Client...")
 
         # test latencies
@@ -255,6 +336,9 @@ class Client:
         Start the client.
         Note: This is a blocking call. If you want to control your own event loop, use `start` instead.
         """
+        if hasattr(asyncio, "eager_task_factory"):
+            # python 3.12+: run tasks eagerly until their first suspension
+            self._loop.set_task_factory(asyncio.eager_task_factory)
         try:
             self._loop.create_task(self.start())
             self._loop.run_forever()
@@ -1,4 +1,5 @@
 import asyncio
+import math
 import random
 import time
 from typing import TYPE_CHECKING
@@ -6,15 +7,43 @@ from typing import TYPE_CHECKING
 import aiohttp
 
 from ..logging import Logger
-from .websocket import ExpTechWebSocket
+from ..utils import json_dumps, json_loads
+from .websocket import DebugExpTechWebSocket, ExpTechWebSocket
 
 if TYPE_CHECKING:
     from .client import Client
 
+EWMA_WEIGHT = 0.2
+"The weight of the newest observed latency in the moving average of a node"
+EWMA_ALPHA = 10
+"How strongly `weighted` node selection prefers lower latency nodes (per second of latency)"
+
 
 class HTTPClient:
     """A HTTP client for interacting with ExpTech API."""
 
+    __slots__ = (
+        "_logger",
+        "_debug_mode",
+        "DOMAIN",
+        "__API_VERSION",
+        "API_NODES",
+        "__base_url",
+        "node_latencies",
+        "_node_ewma",
+        "__current_node_index",
+        "WS_NODES",
+        "_current_ws_node",
+        "ws_node_latencies",
+        "_current_ws_node_index",
+        "_loop",
+        "_session",
+        "_owns_session",
+    )
+
+    _PING_PAYLOAD = json_dumps({"type": "start"})
+    "The pre-serialized payload used to measure websocket latency"
+
     def __init__(
         self,
         logger: Logger,
@@ -36,6 +65,7 @@ class HTTPClient:
         ]
         self.__base_url = self.API_NODES[0]
         self.node_latencies = [(node, float("inf")) for node in self.API_NODES]
+        self._node_ewma: dict[str, float] = {}
         self.__current_node_index = 0
         self.WS_NODES = [f"wss://lb-{i}.{self.DOMAIN}/websocket" for i in range(1, 5)]  # lb-1 ~ lb-4
         self._current_ws_node = self.WS_NODES[0]
@@ -43,17 +73,30 @@ class HTTPClient:
         self._current_ws_node_index = 0
 
         self._loop = loop or asyncio.get_event_loop()
+        # a session given by the caller is still used by it, so it's only closed if created here
+        self._owns_session = session is None
         self._session = session or aiohttp.ClientSession(
             loop=self._loop,
             headers={"User-Agent": "EEW/1.0.0 (https://github.com/watermelon1024/EEW)"},
         )
-        self._session._ws_response_class = ExpTechWebSocket
+        self._session._ws_response_class = DebugExpTechWebSocket if debug else ExpTechWebSocket
 
     # http api node
     async def _test_latency(self, url: str) -> float:
         try:
             start = time.time()
-            async with self._session.get(url) as response:
+            # HEAD only measures the round trip without downloading the payload
+            async with self._session.head(url, allow_redirects=False) as response:
+                if response.ok:
+                    latency = time.time() - start
+                    return latency
+                if response.status not in (404, 405):
+                    return float("inf")
+            # the node doesn't serve HEAD, fall back to a GET of the first byte only
+            start = time.time()
+            async with self._session.get(
+                url, headers={"Range": "bytes=0-0"}, allow_redirects=False
+            ) as response:
                 if response.ok:
                     latency = time.time() - start
                     return latency
@@ -73,16 +116,24 @@ class HTTPClient:
         """
         Switch the API node.
 
-        :param type_or_url: The type or url of the API node. Type supports `next`, `fastest` and `random`.
+        :param type_or_url: The type or url of the API node. Type supports `next`, `fastest`, `random` and `weighted`.
+        `weighted` picks a node randomly, weighted by the moving average latency of its requests.
         :type type_or_url: str
         """
 
-        if type_or_url == "next":
-            idx = (self.__current_node_index + 1) % len(self.node_latencies)
-        elif type_or_url == "fastest":
-            idx = 0
-        elif type_or_url == "random":
-            idx = random.randint(0, len(self.node_latencies) - 1)
+        count = len(self.node_latencies)
+        if type_or_url in ("next", "fastest", "random", "weighted"):
+            if count == 0:
+                self._logger.warning("No API node available to switch to")
+                return
+            if count == 1 or type_or_url == "fastest":
+                idx = 0
+            elif type_or_url == "next":
+                idx = (self.__current_node_index + 1) % count
+            elif type_or_url == "weighted":
+                idx = self._weighted_node_index()
+            else:
+                idx = random.randrange(count)
         else:
             idx = None
 
@@ -94,6 +145,26 @@ class HTTPClient:
         self.__base_url = url
         self._logger.info(f"Switched to API node: {url}")
 
+    def _weighted_node_index(self) -> int:
+        candidates = [
+            (idx, latency)
+            for idx, (node, _) in enumerate(self.node_latencies)
+            if math.isfinite(latency := self._node_ewma.get(node, float("inf")))
+        ]
+        if not candidates:
+            # no latency observed yet
+            return random.randrange(len(self.node_latencies))
+        indices, latencies = zip(*candidates)
+        weights = [math.exp(-EWMA_ALPHA * latency) for latency in latencies]
+        return random.choices(indices, weights=weights)[0]
+
+    def _update_node_latency(self, node: str, latency: float):
+        last = self._node_ewma.get(node)
+        if last is None or not math.isfinite(last) or not math.isfinite(latency):
+            self._node_ewma[node] = latency
+        else:
+            self._node_ewma[node] = (1 - EWMA_WEIGHT) * last + EWMA_WEIGHT * latency
+
     async def request(self, method: str, path: str, *, json: bool = True, retry: int = 0, **kwargs):
         """
         Make a request to the API.
@@ -111,19 +182,24 @@ class HTTPClient:
         :return: The response from the API.
         :rtype: str | dict | Any
         """
-        url = self.__base_url + path
+        base_url = self.__base_url
+        url = base_url + path
         try:
+            start = time.monotonic()
             async with self._session.request(method, url, **kwargs) as r:
-                resp = await r.json() if json else await r.text()
-                self._logger.debug(f"{method} {url} receive {r.status}: {resp}")
+                resp = await r.json(loads=json_loads) if json else await r.text()
+                self._update_node_latency(base_url, time.monotonic() - start)
+                # lazy formatting: the response is only stringified when debug logging is enabled
+                self._logger.debug("{} {} receive {}: {}", method, url, r.status, resp)
                 return resp
         except Exception as e:
+            self._update_node_latency(base_url, float("inf"))
             if isinstance(e, aiohttp.ContentTypeError):
                 self._logger.debug(
                     f"Fail to decode JSON when {method} {url} (receive {r.status}): {await r.text()}"
                 )
             else:
-                self._logger.debug(f"Fail to {method} {url}: {e}")
+                self._logger.debug("Fail to {} {}: {}", method, url, e)
             self.switch_api_node()
             if retry > 0:
                 await asyncio.sleep(1)
@@ -166,10 +242,11 @@ class HTTPClient:
     async def _test_ws_latency(self, url: str) -> float:
         try:
             async with self._session.ws_connect(url) as ws:
+                ws._logger = self._logger  # used by the debug websocket
                 await ws.receive(timeout=5)  # discard first ntp
 
                 start_time = time.time()
-                await ws.send_json({"type": "start"})
+                await ws.send_str(self._PING_PAYLOAD)
                 await ws.receive()
                 latency = time.time() - start_time
                 return latency
@@ -191,12 +268,17 @@ class HTTPClient:
         :type type_or_url: str
         """
 
-        if type_or_url == "next":
-            idx = (self._current_ws_node_index + 1) % len(self.ws_node_latencies)
-        elif type_or_url == "fastest":
-            idx = 0
-        elif type_or_url == "random":
-            idx = random.randint(0, len(self.ws_node_latencies) - 1)
+        count = len(self.ws_node_latencies)
+        if type_or_url in ("next", "fastest", "random"):
+            if count == 0:
+                self._logger.warning("No websocket node available to switch to")
+                return
+            if count == 1 or type_or_url == "fastest":
+                idx = 0
+            elif type_or_url == "next":
+                idx = (self._current_ws_node_index + 1) % count
+            else:
+                idx = random.randrange(count)
         else:
             idx = None
 
@@ -215,3 +297,10 @@ class HTTPClient:
         if not self._current_ws_node:
             self._current_ws_node = self.WS_NODES[0]
         return await ExpTechWebSocket.connect(client)
+
+    async def close(self):
+        """
+        Close the underlying HTTP session if it was created by this client.
+        """
+        if self._owns_session and not self._session.closed:
+            await self._session.close()
@@ -1,11 +1,29 @@
 import asyncio
-import json
+import re
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Optional, Union
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional, Union
 
 import aiohttp
 
 from ..logging import Logger
+from ..utils import json_dumps, json_loads
+
+_WS_TEXT = aiohttp.WSMsgType.TEXT
+_WS_BINARY = aiohttp.WSMsgType.BINARY
+_WS_ERROR = aiohttp.WSMsgType.ERROR
+
+_MSG_HANDLEABLE = 0
+_MSG_ERROR = 1
+_MSG_CLOSED = 2
+_MSG_ACTION = {
+    _WS_TEXT: _MSG_HANDLEABLE,
+    _WS_BINARY: _MSG_HANDLEABLE,
+    _WS_ERROR: _MSG_ERROR,
+    aiohttp.WSMsgType.CLOSED: _MSG_CLOSED,
+    aiohttp.WSMsgType.CLOSING: _MSG_CLOSED,
+    aiohttp.WSMsgType.CLOSE: _MSG_CLOSED,
+}
+"How receive_and_check treats each message type, unlisted types are unhandleable"
 
 if TYPE_CHECKING:
     from .client import Client
@@ -69,6 +87,27 @@ class WebSocketEvent(Enum):
     ERROR = "error"
 
 
+_EVENT_VERIFY = WebSocketEvent.VERIFY.value
+_EVENT_INFO = WebSocketEvent.INFO.value
+_EVENT_NTP = WebSocketEvent.NTP.value
+_EVENT_DATA = "data"
+
+_VERIFY_FAILURES: dict[int, Callable[[Optional[str]], Exception]] = {
+    # api key in used
+    400: lambda message: WebSocketReconnect("API key is already in used", reopen=True),
+    # no api key or invalid api key
+    401: AuthorizationFailed,
+    # vip membership expired
+    403: AuthorizationFailed,
+    429: lambda message: WebSocketReconnect("Rate limit exceeded", reopen=True),
+}
+"The exception to raise for each failed verify code, built from the server message"
+
+_TYPE_PEEK = re.compile(r'"type"\s*:\s*"([^"]*)"')
+"Matches the frame type at the head of a raw frame, without decoding the whole frame"
+_TYPE_PEEK_LENGTH = 64
+
+
 class WebSocketService(Enum):
     """Represent the supported websokcet service"""
 
@@ -95,6 +134,8 @@ class WebSocketConnectionConfig:
     Represents the configuration for the websocket connection.
     """
 
+    __slots__ = ("key", "service", "config", "_start_payload")
+
     def __init__(
         self,
         key: str,
@@ -112,6 +153,7 @@ class WebSocketConnectionConfig:
         self.key = key
         self.service = service
         self.config = config
+        self.invalidate()
 
     def to_dict(self):
         return {
@@ -120,6 +162,12 @@ class WebSocketConnectionConfig:
             "config": self.config,
         }
 
+    def invalidate(self):
+        """
+        Rebuild the cached start payload. Call this after modifying the configuration.
+        """
+        self._start_payload = json_dumps({**self.to_dict(), "type": "start"})
+
 
 # WebSocketAuthenticationInfo = Union[dict[str, Union[int, list[SupportedService]]], dict[str, Union[int, str]]]
 
@@ -134,15 +182,8 @@ class ExpTechWebSocket(aiohttp.ClientWebSocketResponse):
     config: WebSocketConnectionConfig
     subscribed_services: list[Union[WebSocketService, str]]
     __wait_until_ready: asyncio.Event
-
-    async def debug_receive(self, timeout: float | None = None) -> aiohttp.WSMessage:
-        msg = await super().receive(timeout)
-        self._logger.debug(f"Websocket received: {msg}")
-        return msg
-
-    async def debug_send_str(self, data: str, compress: int | None = None) -> None:
-        self._logger.debug(f"Websocket sending: {data}")
-        return await super().send_str(data, compress)
+    _dispatch: dict[str, Callable[[dict], Awaitable[None]]]
+    _emit: Callable[..., Awaitable[None]]
 
     @classmethod
     async def connect(cls, client: "Client", **kwargs):
@@ -151,13 +192,16 @@ class ExpTechWebSocket(aiohttp.ClientWebSocketResponse):
         """
         self: cls = await client._http._session.ws_connect(client._http._current_ws_node, **kwargs)
         self.__client = client
+        self._emit = client._emit
         self._logger = client.logger
         self.config = client.websocket_config
         self.subscribed_services = []
-        if client.debug_mode:
-            self.receive = self.debug_receive
-            self.send_str = self.debug_send_str
-
+        self._dispatch = {
+            _EVENT_VERIFY: self._on_verify,
+            _EVENT_INFO: self._on_info,
+            _EVENT_DATA: self._on_data,
+            _EVENT_NTP: self._on_ntp,
+        }
         self.__wait_until_ready = asyncio.Event()
         await self.verify()
         # while not self.__wait_until_ready.is_set():
@@ -165,13 +209,19 @@ class ExpTechWebSocket(aiohttp.ClientWebSocketResponse):
 
         return self
 
+    async def send_json(
+        self, data: Any, compress: int | None = None, *, dumps: Callable[[Any], str] = json_dumps
+    ) -> None:
+        """
+        Send data to the websocket as json, encoded with orjson when available.
+        """
+        await self.send_str(dumps(data), compress=compress)
+
     async def send_verify(self):
         """
         Send the verify data to the websocket.
         """
-        data = self.config.to_dict()
-        data["type"] = "start"
-        await self.send_json(data)
+        await self.send_str(self.config._start_payload)
 
     async def verify(self):
         """
@@ -181,7 +231,12 @@ class ExpTechWebSocket(aiohttp.ClientWebSocketResponse):
         :rtype: list[SupportedService]
         """
         await self.send_verify()
-        data = await asyncio.wait_for(self.wait_for_verify(), timeout=60)
+        if hasattr(asyncio, "timeout"):
+            # python 3.11+: time out in place instead of wrapping the wait in a new task
+            async with asyncio.timeout(60):
+                data = await self.wait_for_verify()
+        else:
+            data = await asyncio.wait_for(self.wait_for_verify(), timeout=60)
         self.subscribed_services = data["list"]
         self.__wait_until_ready.set()
         return self.subscribed_services
@@ -199,29 +254,21 @@ class ExpTechWebSocket(aiohttp.ClientWebSocketResponse):
         """
         while True:
             msg = await self.receive_and_check()
-            data = json.loads(msg.data)
-            if data.get("type") == WebSocketEvent.VERIFY.value:
+            data = json_loads(msg.data)
+            event = data.get("type")
+            if event == _EVENT_VERIFY:
                 await self.send_verify()
-            if data.get("type") != WebSocketEvent.INFO.value:
+            if event != _EVENT_INFO:
                 continue
 
             data = data["data"]
-            message = data.get("message")
             code = data.get("code")
             if code == 200:
                 # subscribe successfully
                 return data
-            elif code == 400:
-                # api key in used
-                raise WebSocketReconnect("API key is already in used", reopen=True)
-            elif code == 401:
-                # no api key or invalid api key
-                raise AuthorizationFailed(message)
-            elif code == 403:
-                # vip membership expired
-                raise AuthorizationFailed(message)
-            elif code == 429:
-                raise WebSocketReconnect("Rate limit exceeded", reopen=True)
+            failure = _VERIFY_FAILURES.get(code)
+            if failure is not None:
+                raise failure(data.get("message"))
 
     async def wait_until_ready(self):
         """Wait until websocket client is ready"""
@@ -239,51 +286,61 @@ class ExpTechWebSocket(aiohttp.ClientWebSocketResponse):
         """
 
         msg = await self.receive(timeout=90)
-        if msg.type is aiohttp.WSMsgType.TEXT:
-            return msg
-        elif msg.type is aiohttp.WSMsgType.BINARY:
+        action = _MSG_ACTION.get(msg.type)
+        if action == _MSG_HANDLEABLE:
             return msg
-        elif msg.type is aiohttp.WSMsgType.ERROR:
+        elif action == _MSG_ERROR:
             raise WebSocketException(msg)
-        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.CLOSE):
+        elif action == _MSG_CLOSED:
             raise WebSocketClosure
         else:
             raise WebSocketException(msg, "Websocket received unhandleable message")
 
     async def _handle(self, msg: aiohttp.WSMessage):
-        if msg.type is aiohttp.WSMsgType.TEXT:
-            await self._handle_json(json.loads(msg.data))
-        elif msg.type is aiohttp.WSMsgType.BINARY:
+        msg_type = msg.type
+        if msg_type is _WS_TEXT:
+            match = _TYPE_PEEK.search(msg.data, 0, _TYPE_PEEK_LENGTH)
+            if (
+                match is not None
+                and match[1] == _EVENT_NTP
+                and _EVENT_NTP not in self.__client.event_handlers
+            ):
+                # nobody listens to ntp frames, skip decoding them
+                return
+            await self._handle_json(json_loads(msg.data))
+        elif msg_type is _WS_BINARY:
             await self._handle_binary(msg.data)
 
     async def _handle_binary(self, data: bytes):
         pass
 
     async def _handle_json(self, data: dict):
-        event_type = data.get("type")
-        if event_type == WebSocketEvent.VERIFY.value:
+        handler = self._dispatch.get(data.get("type"))
+        if handler is not None:
+            await handler(data)
+
+    async def _on_verify(self, data: dict):
+        await self.verify()
+
+    async def _on_info(self, data: dict):
+        data_ = data.get("data", {})
+        code = data_.get("code")
+        if code == 503:
+            await asyncio.sleep(5)
             await self.verify()
-        elif event_type == WebSocketEvent.INFO.value:
-            data_ = data.get("data", {})
-            code = data_.get("code")
-            if code == 503:
-                await asyncio.sleep(5)
-                await self.verify()
-            else:
-                await self._emit(WebSocketEvent.INFO.value, data_)
-        elif event_type == "data":
-            time = data.get("time")
-            data_ = data.get("data", {})
-            data_["time"] = time
-            data_type = data_.get("type")
-            if data_type:
-                await self._emit(data_type, data_)
-        elif event_type == WebSocketEvent.NTP.value:
-            await self._emit(WebSocketEvent.NTP.value, data)
-
-    @property
-    def _emit(self):
-        return self.__client._emit
+        else:
+            await self._emit(_EVENT_INFO, data_)
+
+    async def _on_data(self, data: dict):
+        time = data.get("time")
+        data_ = data.get("data", {})
+        data_["time"] = time
+        data_type = data_.get("type")
+        if data_type:
+            await self._emit(data_type, data_)
+
+    async def _on_ntp(self, data: dict):
+        await self._emit(_EVENT_NTP, data)
 
     async def pool_event(self):
         try:
@@ -297,3 +354,19 @@ class ExpTechWebSocket(aiohttp.ClientWebSocketResponse):
             raise WebSocketReconnect("Websocket message received timeout", reopen=False) from e
         except WebSocketException as e:
             self._logger.error(f"Websocket received an error: {e.description or e.message.data}", exc_info=e)
+
+
+class DebugExpTechWebSocket(ExpTechWebSocket):
+    """
+    A websocket connection to the ExpTech API that logs every message received and sent.
+    Used instead of :class:`ExpTechWebSocket` in debug mode, so the normal connection keeps the plain methods.
+    """
+
+    async def receive(self, timeout: float | None = None) -> aiohttp.WSMessage:
+        msg = await super().receive(timeout)
+        self._logger.debug("Websocket received: {}", msg)
+        return msg
+
+    async def send_str(self, data: str, compress: int | None = None) -> None:
+        self._logger.debug("Websocket sending: {}", data)
+        return await super().send_str(data, compress)
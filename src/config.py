@@ -1,6 +1,30 @@
 from typing import Any, Union
 
-import tomli
+try:
+    import tomllib
+except ImportError:  # python < 3.11
+    import tomli as tomllib
+
+
+def _flatten(config: dict, prefix: str = "") -> dict[str, Any]:
+    """
+    Flatten the nested tables of the configuration into dotted keys, top-level keys are kept as is.
+
+    :param config: The configuration to flatten.
+    :type config: dict
+    :param prefix: The dotted path of the table, defaults to ""
+    :type prefix: str
+
+    :return: The flattened configuration.
+    :rtype: dict[str, Any]
+    """
+    flat = {}
+    for key, value in config.items():
+        path = prefix + key
+        flat[path] = value
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path + "."))
+    return flat
 
 
 class Config:
@@ -10,7 +34,8 @@ class Config:
 
     _path: str = "config.toml"
     with open(_path, "rb") as f:
-        _config: dict = tomli.load(f)
+        _config: dict = tomllib.load(f)
+    _flat: dict[str, Any] = _flatten(_config)
 
     @classmethod
     def _load_config(cls) -> dict:
@@ -25,12 +50,13 @@ class Config:
         :rtype: dict
         """
         with open(cls._path, "rb") as f:
-            return tomli.load(f)
+            return tomllib.load(f)
 
     @classmethod
     def get(cls, key: str, default: Any = None) -> Union[str, Any]:
         """
         Get a key from the configuration file.
+        Keys of nested tables can be given as a dotted path, e.g. `log.retention`.
 
         :param key: The key to get.
         :type key: str
@@ -40,7 +66,7 @@ class Config:
         :return: The value of the key.
         :rtype: str, Any
         """
-        return cls._config.get(key, default)
+        return cls._flat.get(key, default)
 
     @classmethod
     def reload(cls) -> None:
@@ -48,6 +74,7 @@ class Config:
         Reload the configuration file.
         """
         cls._config = cls._load_config()
+        cls._flat = _flatten(cls._config)
 
     def __getitem__(self, key: str) -> Any:
         """
@@ -1,25 +1,58 @@
 import asyncio
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from types import MappingProxyType
 
 from ..utils import MISSING
-from .location import REGIONS_GROUP_BY_CITY, EarthquakeLocation, RegionLocation
+from .location import CITY_REGION_INDICES, REGION_CODES, EarthquakeLocation, RegionLocation
 from .map import Map
 from .model import (
+    INTENSITY_DISPLAY,
     Intensity,
+    RegionExpectedIntensities,
     RegionExpectedIntensity,
     WaveModel,
     calculate_expected_intensity_and_travel_time,
     get_wave_model,
 )
 
-PROVIDER_DISPLAY = {
-    "cwa": "中央氣象署",
-    "trem": "TREM 臺灣即時地震監測",
-    "kam": "기상청 날씨누리",
-    "jma": "気象庁",
-    "nied": "防災科研",
-    "scdzj": "四川省地震局",
-}
+PROVIDER_DISPLAY = MappingProxyType(
+    {
+        "cwa": "中央氣象署",
+        "trem": "TREM 臺灣即時地震監測",
+        "kam": "기상청 날씨누리",
+        "jma": "気象庁",
+        "nied": "防災科研",
+        "scdzj": "四川省地震局",
+    }
+)
+
+_CALC_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="eew-calc")
+"Executor of the intensity and map calculation, kept apart from the default executor used for I/O and parsing"
+
+_INTENSITY_BY_VALUE = {i: Intensity(i) for i in INTENSITY_DISPLAY}
+"The shared intensity objects of the integer intensities reported by the providers"
+
+_MAP_LOCK = threading.Lock()
+"Guards the lazy creation of maps, the calculation executor and the event loop may both create it first"
+
+_new = object.__new__
+_fromtimestamp = datetime.fromtimestamp
+
+
+def _from_milliseconds(timestamp: int) -> datetime:
+    """
+    Convert a timestamp in milliseconds to a local datetime, split with integers instead of a float division.
+
+    :param timestamp: The timestamp in milliseconds.
+    :type timestamp: int
+    :return: The local datetime.
+    :rtype: datetime
+    """
+    seconds, milliseconds = divmod(int(timestamp), 1000)
+    return _fromtimestamp(seconds).replace(microsecond=milliseconds * 1000)
 
 
 class EarthquakeData:
@@ -40,7 +73,6 @@ class EarthquakeData:
         "_p_arrival_distance_interp_func",
         "_s_arrival_distance_interp_func",
         "_map",
-        "_intensity_calculated",
     )
 
     def __init__(
@@ -71,11 +103,10 @@ class EarthquakeData:
         self._time = time
         self._max_intensity = max_intensity
         self._model = get_wave_model(depth)
-        self._intensity_calculated = asyncio.Event()
         self._calc_task: asyncio.Future = None
         self._city_max_intensity: dict[str, RegionExpectedIntensity] = None
-        self._expected_intensity: dict[int, RegionExpectedIntensity] = None
-        self._map: Map = Map(self)
+        self._expected_intensity: RegionExpectedIntensities = None
+        self._map: Map = None
 
     @property
     def location(self) -> EarthquakeLocation:
@@ -134,7 +165,7 @@ class EarthquakeData:
         return self._model
 
     @property
-    def expected_intensity(self) -> dict[int, RegionExpectedIntensity]:
+    def expected_intensity(self) -> RegionExpectedIntensities:
         """
         The expected intensity of the earthquake (if have been calculated).
         """
@@ -152,6 +183,11 @@ class EarthquakeData:
         """
         The intensity map object of the earthquake (if have been calculated).
         """
+        # created on first use, most events never need a map
+        if self._map is None:
+            with _MAP_LOCK:
+                if self._map is None:
+                    self._map = Map(self)
         return self._map
 
     @classmethod
@@ -168,48 +204,38 @@ class EarthquakeData:
             location=EarthquakeLocation(data["lon"], data["lat"], data.get("loc", MISSING)),
             magnitude=data["mag"],
             depth=data["depth"],
-            time=datetime.fromtimestamp(data["time"] / 1000),
-            max_intensity=Intensity(i) if (i := data.get("max")) is not None else MISSING,
+            time=_from_milliseconds(data["time"]),
+            max_intensity=(
+                _INTENSITY_BY_VALUE.get(i) or Intensity(i) if (i := data.get("max")) is not None else MISSING
+            ),
         )
 
-    def calc_expected_intensity(
-        self, regions: list[RegionLocation] = MISSING
-    ) -> dict[int, RegionExpectedIntensity]:
+    def calc_expected_intensity(self, regions: list[RegionLocation] = MISSING) -> RegionExpectedIntensities:
         """
         Calculate the expected intensity of the earthquake.
         """
-        intensities = calculate_expected_intensity_and_travel_time(self, regions)
-        self._expected_intensity = dict(intensities)
-        self._city_max_intensity = {
-            city: max(city_intensities, key=lambda x: x.intensity._float_value)
-            for city, regions in REGIONS_GROUP_BY_CITY.items()
-            if (
-                city_intensities := [
-                    intensity
-                    for region in regions
-                    if (intensity := self._expected_intensity.get(region.code))
-                ]
-            )
-        }
-        self._intensity_calculated.set()
+        self._expected_intensity = calculate_expected_intensity_and_travel_time(self, regions)
+        # reduce each city with numpy, regions not calculated are -inf so they are never the maximum,
+        # only the objects of the maximum region of each city are created
+        values = self._expected_intensity.float_intensities(REGION_CODES)
+        self._city_max_intensity = {}
+        for city, indices in CITY_REGION_INDICES.items():
+            city_values = values[indices]
+            best = city_values.argmax()
+            if city_values[best] > -math.inf:
+                self._city_max_intensity[city] = self._expected_intensity[REGION_CODES[indices[best]]]
         return self._expected_intensity
 
     def calc_all_data(self):
         try:
-            self._intensity_calculated.clear()
             self.calc_expected_intensity()
             self.map.draw()
         except asyncio.CancelledError:
-            self._map._drawn = False
-            pass
-        except Exception:
-            self._calc_task.cancel()
-        finally:
-            pass
+            self.map._drawn = False
 
     def calc_all_data_in_executor(self, loop: asyncio.AbstractEventLoop):
         if self._calc_task is None:
-            self._calc_task = loop.run_in_executor(None, self.calc_all_data)
+            self._calc_task = loop.run_in_executor(_CALC_EXECUTOR, self.calc_all_data)
         return self._calc_task
 
     async def wait_until_intensity_calculated(self):
@@ -221,7 +247,7 @@ class Provider:
     Represents the data of an EEW provider.
     """
 
-    __slots__ = ("_name",)
+    __slots__ = ("_name", "_display_name")
 
     def __init__(self, name: str) -> None:
         """
@@ -231,6 +257,7 @@ class Provider:
         :type name: str
         """
         self._name = name
+        self._display_name = PROVIDER_DISPLAY.get(name, name)
 
     @property
     def name(self) -> str:
@@ -244,7 +271,26 @@ class Provider:
         """
         The display name of the provider.
         """
-        return PROVIDER_DISPLAY.get(self._name, self._name)
+        return self._display_name
+
+
+_PROVIDER_CACHE: dict[str, Provider] = {}
+"Provider objects by name, providers are immutable so one object is shared by all EEWs of the same provider"
+
+
+def _get_provider(name: str) -> Provider:
+    """
+    Get the shared provider object of the given name.
+
+    :param name: The name of the provider.
+    :type name: str
+    :return: The provider object.
+    :rtype: Provider
+    """
+    provider = _PROVIDER_CACHE.get(name)
+    if provider is None:
+        provider = _PROVIDER_CACHE[name] = Provider(name)
+    return provider
 
 
 class EEW:
@@ -338,11 +384,12 @@ class EEW:
         :return: The EEW object.
         :rtype: EEW
         """
-        return cls(
-            id=data["id"],
-            serial=data["serial"],
-            final=bool(data["final"]),
-            earthquake=EarthquakeData.from_dict(data=data["eq"]),
-            provider=Provider(data["author"]),
-            time=datetime.fromtimestamp(data["time"] / 1000),
-        )
+        # fill the slots directly instead of going through the keyword arguments of __init__
+        self = _new(cls)
+        self._id = data["id"]
+        self._serial = data["serial"]
+        self._final = bool(data["final"])
+        self._earthquake = EarthquakeData.from_dict(data=data["eq"])
+        self._provider = _get_provider(data["author"])
+        self._time = _from_milliseconds(data["time"])
+        return self
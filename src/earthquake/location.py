@@ -1,9 +1,26 @@
-import json
+import logging
+import os
+import pickle
 from typing import Union
 
 import geopandas as gpd
+import numpy as np
+import shapely
 
-from ..utils import MISSING
+from ..utils import MISSING, json_loads
+
+DEFAULT_SITE_EFFECT = 1.751
+"The site effect factor of the regions without one"
+GEO_CACHE_PATH = "asset/geo_data.pkl"
+"The cache of the parsed map data, it is rebuilt whenever its key doesn't match `_geo_cache_key()`"
+GEO_CACHE_VERSION = 1
+"The version of the cached map data format, bump it whenever the map files are parsed differently"
+GEO_SOURCES = ("asset/town_map.json", "asset/country_map.json")
+"The map files the cached map data is parsed from"
+TOWN_SIMPLIFY_TOLERANCE = 0.005
+"The tolerance (in degrees) the town boundaries are simplified with"
+
+_log = logging.getLogger(__name__)
 
 
 class Location:
@@ -11,7 +28,7 @@ class Location:
     A base class represents a location with longitude and latitude.
     """
 
-    __slots__ = ("_longitude", "_latitude")
+    __slots__ = ("_longitude", "_latitude", "_hash")
 
     def __init__(self, longitude: float, latitude: float):
         """
@@ -24,6 +41,7 @@ class Location:
         """
         self._longitude = longitude
         self._latitude = latitude
+        self._hash = hash((longitude, latitude))
 
     @property
     def lon(self):
@@ -46,13 +64,13 @@ class Location:
 
     def __eq__(self, other):
         return (
-            issubclass(other, Location)
+            isinstance(other, Location)
             and self._longitude == other._longitude
             and self._latitude == other._latitude
         )
 
     def __hash__(self):
-        return hash((self._longitude, self._latitude))
+        return self._hash
 
     def to_dict(self) -> dict[str, float]:
         """
@@ -69,7 +87,7 @@ class EarthquakeLocation(Location):
     Represents a earthquake location.
     """
 
-    __slots__ = ("_longitude", "_latitude", "_display_name")
+    __slots__ = ("_display_name",)
 
     def __init__(self, longitude: float, latitude: float, display: str = MISSING):
         """
@@ -96,7 +114,7 @@ class RegionLocation(Location):
     Represents a region with longitude, latitude, region code and name.
     """
 
-    __slots__ = ("_longitude", "_latitude", "_code", "_name", "_city", "_area", "_site_effect")
+    __slots__ = ("_code", "_name", "_city", "_area", "_site_effect")
 
     def __init__(
         self,
@@ -133,16 +151,6 @@ class RegionLocation(Location):
         self._area = area
         self._site_effect = site_effect
 
-    @property
-    def lon(self):
-        """The longitude of the location."""
-        return self._longitude
-
-    @property
-    def lat(self):
-        """The latitude of the location."""
-        return self._latitude
-
     @property
     def code(self):
         """The identifier of the location."""
@@ -187,6 +195,26 @@ def _parse_region_dict(
     return all_regions
 
 
+def region_arrays(regions: list[RegionLocation]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Lay out the longitudes, latitudes and site effects of the regions as arrays.
+
+    :param regions: The regions.
+    :type regions: list[RegionLocation]
+    :return: The longitudes, latitudes and site effects (missing ones are the default) of the regions.
+    :rtype: tuple[np.ndarray, np.ndarray, np.ndarray]
+    """
+    return (
+        np.fromiter((region.lon for region in regions), dtype=np.float64, count=len(regions)),
+        np.fromiter((region.lat for region in regions), dtype=np.float64, count=len(regions)),
+        np.fromiter(
+            (region.side_effect or DEFAULT_SITE_EFFECT for region in regions),
+            dtype=np.float64,
+            count=len(regions),
+        ),
+    )
+
+
 def _group_region_by_city(regions: dict[int, RegionLocation]) -> dict[str, list[RegionLocation]]:
     grouped_regions: dict[str, list[RegionLocation]] = {}
     for region in regions.values():
@@ -194,22 +222,99 @@ def _group_region_by_city(regions: dict[int, RegionLocation]) -> dict[str, list[
     return grouped_regions
 
 
-TAIWAN_CENTER = Location(120.982025, 23.973875)
-"The center of Taiwan"
+def _group_region_index_by_city(regions: dict[int, RegionLocation]) -> dict[str, np.ndarray]:
+    grouped_index: dict[str, list[int]] = {}
+    for index, region in enumerate(regions.values()):
+        grouped_index.setdefault(region.city, []).append(index)
+    return {city: np.array(index, dtype=np.intp) for city, index in grouped_index.items()}
 
-with open("asset/region.json", "r", encoding="utf-8") as f:
-    REGIONS: dict[int, RegionLocation] = _parse_region_dict(json.load(f))
-REGIONS_GROUP_BY_CITY: dict[str, list[RegionLocation]] = _group_region_by_city(REGIONS)
 
-with open("asset/town_map.json", "r", encoding="utf-8") as f:
-    _raw_geo_data = json.load(f)["features"]
-    TOWN_DATA: gpd.GeoDataFrame = gpd.GeoDataFrame.from_features(_raw_geo_data)
-    TOWN_DATA["geometry"] = TOWN_DATA["geometry"].simplify(tolerance=0.005)
-    TOWN_RANGE = {
-        int(d["id"]): TOWN_DATA[TOWN_DATA["TOWNCODE"] == d["properties"]["TOWNCODE"]]
-        for d in _raw_geo_data
+def _build_geo_data() -> tuple[gpd.GeoDataFrame, dict[int, gpd.GeoDataFrame], gpd.GeoDataFrame]:
+    """
+    Parse the town and country map files.
+
+    :return: The town data, the towns of each region and the country data.
+    :rtype: tuple[gpd.GeoDataFrame, dict[int, gpd.GeoDataFrame], gpd.GeoDataFrame]
+    """
+    with open(GEO_SOURCES[0], "rb") as f:
+        raw_geo_data = json_loads(f.read())["features"]
+    town_data = gpd.GeoDataFrame.from_features(raw_geo_data)
+    town_data["geometry"] = town_data["geometry"].simplify(tolerance=TOWN_SIMPLIFY_TOLERANCE)
+    town_range = {
+        int(d["id"]): town_data[town_data["TOWNCODE"] == d["properties"]["TOWNCODE"]]
+        for d in raw_geo_data
         if d["id"].isdigit()
     }
-with open("asset/country_map.json", "r", encoding="utf-8") as f:
-    _raw_geo_data = json.load(f)["features"]
-    COUNTRY_DATA: gpd.GeoDataFrame = gpd.GeoDataFrame.from_features(_raw_geo_data)
+    with open(GEO_SOURCES[1], "rb") as f:
+        country_data = gpd.GeoDataFrame.from_features(json_loads(f.read())["features"])
+    return town_data, town_range, country_data
+
+
+def _geo_cache_key() -> tuple:
+    """
+    The key the cached map data is valid for.
+
+    It covers the cache format, the parsing parameters, the versions of the libraries the data is
+    pickled with and the modification time of the map files.
+
+    :return: The cache key.
+    :rtype: tuple
+    """
+    return (
+        GEO_CACHE_VERSION,
+        TOWN_SIMPLIFY_TOLERANCE,
+        gpd.__version__,
+        shapely.__version__,
+        tuple(os.path.getmtime(path) for path in GEO_SOURCES),
+    )
+
+
+def _load_geo_data() -> tuple[gpd.GeoDataFrame, dict[int, gpd.GeoDataFrame], gpd.GeoDataFrame]:
+    """
+    Load the parsed map data from the cache, or parse the map files and cache them if the cache is outdated.
+
+    :return: The town data, the towns of each region and the country data.
+    :rtype: tuple[gpd.GeoDataFrame, dict[int, gpd.GeoDataFrame], gpd.GeoDataFrame]
+    """
+    key = _geo_cache_key()
+    try:
+        with open(GEO_CACHE_PATH, "rb") as f:
+            # the key is pickled before the data, so an outdated cache is never unpickled
+            if pickle.load(f) == key:
+                return pickle.load(f)
+        _log.debug("Map data cache is outdated, rebuilding it")
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+        _log.debug(f"Failed to load the map data cache, rebuilding it: {e!r}")
+    geo_data = _build_geo_data()
+    try:
+        # write to a temporary file first, so another process never reads a partial cache
+        temp_path = f"{GEO_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(geo_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, GEO_CACHE_PATH)
+    except OSError as e:
+        _log.debug(f"Failed to save the map data cache: {e!r}")
+    return geo_data
+
+
+TAIWAN_CENTER = Location(120.982025, 23.973875)
+"The center of Taiwan"
+
+with open("asset/region.json", "rb") as f:
+    REGIONS: dict[int, RegionLocation] = _parse_region_dict(json_loads(f.read()))
+REGIONS_GROUP_BY_CITY: dict[str, list[RegionLocation]] = _group_region_by_city(REGIONS)
+REGION_CODES: tuple[int, ...] = tuple(REGIONS)
+"The region codes in the order of `REGIONS`, the per-region arrays are laid out in this order"
+CITY_REGION_INDICES: dict[str, np.ndarray] = _group_region_index_by_city(REGIONS)
+"The positions in `REGION_CODES` of the regions in each city"
+REGION_LON, REGION_LAT, REGION_SITE_EFFECT = region_arrays(list(REGIONS.values()))
+"The longitudes, latitudes and site effects of `REGIONS` as contiguous arrays, in the order of `REGION_CODES`"
+REGION_LON_RAD: np.ndarray = np.radians(REGION_LON)
+"The longitudes of `REGIONS` in radians"
+REGION_LAT_RAD: np.ndarray = np.radians(REGION_LAT)
+"The latitudes of `REGIONS` in radians"
+REGION_COS_LAT: np.ndarray = np.cos(REGION_LAT_RAD)
+"The cosines of the latitudes of `REGIONS`, they never change so the haversine formula doesn't recompute them"
+
+TOWN_DATA, TOWN_RANGE, COUNTRY_DATA = _load_geo_data()
@@ -1,13 +1,22 @@
+import asyncio
 import io
+import threading
 import warnings
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import compress
 from typing import TYPE_CHECKING
 
-import geopandas as gpd
 import matplotlib.image as mpimg
 import matplotlib.pyplot as plt
-import pandas as pd
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PathCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.figure import Figure
 from matplotlib.offsetbox import AnnotationBbox, OffsetImage
+from matplotlib.patches import Circle
+from matplotlib.path import Path
 
 from .location import COUNTRY_DATA, TAIWAN_CENTER, TOWN_DATA, TOWN_RANGE
 
@@ -31,8 +40,108 @@ INTENSITY_COLOR: dict[int, str] = {
     8: "#7B170F",
     9: "#7237C1",
 }
+INTENSITY_RGBA: np.ndarray = to_rgba_array([color or "none" for color in INTENSITY_COLOR.values()])
+"The RGBA color of each intensity value, indexing it with the intensities gives the colors at once"
+FIGURE_SIZE = (4, 6)
+"The size of the map figure in inches"
+FIGURE_DPI = 100
+"The resolution of the map figure, the prerendered basemap is rendered with the same one"
+PNG_OPTIONS = {"compress_level": 1}
+"Options of the PNG encoder, the flat colored map barely grows with fast compression"
+_SAVE_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="map-save")
 legend_img = mpimg.imread("asset/map_legend.png")
-legend_offset = OffsetImage(legend_img, zoom=0.5)
+_region_codes = None
+_region_bounds = None
+_town_path_list = None
+
+
+def use_mplcairo() -> bool:
+    """
+    Render the maps with mplcairo instead of Agg if it is installed.
+    This must be called before the first map is drawn.
+
+    :return: Whether mplcairo is used.
+    :rtype: bool
+    """
+    try:
+        import mplcairo  # noqa: F401
+    except ImportError:
+        return False
+    plt.switch_backend("module://mplcairo.base")
+    return True
+
+
+def _region_bounding_boxes():
+    """
+    Compute the bounding box of the towns of each region on first use.
+
+    :return: The region codes and their (min_lon, min_lat, max_lon, max_lat) boxes in the same order.
+    :rtype: tuple[tuple[int, ...], np.ndarray]
+    """
+    global _region_codes, _region_bounds
+    if _region_bounds is None:
+        _region_codes = tuple(TOWN_RANGE)
+        _region_bounds = np.array([TOWN_RANGE[code].total_bounds for code in _region_codes])
+    return _region_codes, _region_bounds
+
+
+def _town_paths():
+    """
+    Convert the polygons of the towns to matplotlib paths on first use.
+
+    :return: The path of each town, in the order of `TOWN_DATA`.
+    :rtype: list[Path]
+    """
+    global _town_path_list
+    if _town_path_list is None:
+
+        def to_path(geometry) -> Path:
+            if geometry is None or geometry.is_empty:
+                return Path(np.empty((0, 2)))
+            polygons = getattr(geometry, "geoms", (geometry,))
+            return Path.make_compound_path(
+                *(
+                    Path(np.asarray(ring.coords)[:, :2])
+                    for polygon in polygons
+                    for ring in (polygon.exterior, *polygon.interiors)
+                )
+            )
+
+        _town_path_list = [to_path(geometry) for geometry in TOWN_DATA.geometry]
+    return _town_path_list
+
+
+@lru_cache(maxsize=8)
+def _town_basemap(extent: tuple[float, float, float, float], zoom: float) -> tuple[np.ndarray, tuple]:
+    """
+    Prerender the towns of the given map boundary to an image.
+    Serial updates of an earthquake share the boundary, and every saved frame only copies the image
+    instead of rasterizing all the town polygons again.
+
+    :param extent: The (min_lon, max_lon, min_lat, max_lat) boundary of the map.
+    :type extent: tuple[float, float, float, float]
+    :param zoom: The zoom level of the map.
+    :type zoom: float
+    :return: The RGBA image and the boundary it covers.
+    :rtype: tuple[np.ndarray, tuple[float, float, float, float]]
+    """
+    # a standalone figure, it is never registered to pyplot so it doesn't need to be closed
+    fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    canvas = FigureCanvasAgg(fig)
+    fig.patch.set_alpha(0)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    min_lon, max_lon, min_lat, max_lat = extent
+    ax.set_xlim(min_lon, max_lon)
+    ax.set_ylim(min_lat, max_lat)
+    TOWN_DATA.plot(ax=ax, facecolor="lightgrey", edgecolor="black", linewidth=0.22 / zoom)
+    canvas.draw()
+    # crop to the axes, the equal aspect may shrink them inside the figure
+    image = np.asarray(canvas.buffer_rgba())
+    x0, y0, x1, y1 = np.round(ax.get_window_extent().extents).astype(int)
+    height = image.shape[0]
+    image = image[height - y1 : height - y0, x0:x1].copy()
+    return image, (*ax.get_xlim(), *ax.get_ylim())
 
 
 class Map:
@@ -40,7 +149,18 @@ class Map:
     Represents the map for earthquake.
     """
 
-    __slots__ = ("_eq", "_image", "fig", "ax", "_drawn", "p_wave", "s_wave")
+    __slots__ = (
+        "_eq",
+        "_image",
+        "_zoom",
+        "_extent",
+        "_lock",
+        "fig",
+        "ax",
+        "_drawn",
+        "p_wave",
+        "s_wave",
+    )
 
     def __init__(self, earthquake: "EarthquakeData"):
         """
@@ -51,8 +171,22 @@ class Map:
         """
         self._eq = earthquake
         self._image = None
+        # map boundary, it only depends on the epicenter
+        zoom = 1  # TODO: change zoom according to magnitude
+        mid_lon, mid_lat = (TAIWAN_CENTER.lon + earthquake.lon) / 2, (TAIWAN_CENTER.lat + earthquake.lat) / 2
+        lon_boundary, lat_boundary = 1.6 * zoom, 2.4 * zoom
+        self._zoom = zoom
+        self._extent = (
+            mid_lon - lon_boundary,
+            mid_lon + lon_boundary,
+            mid_lat - lat_boundary,
+            mid_lat + lat_boundary,
+        )
+        "The (min_lon, max_lon, min_lat, max_lat) boundary of the map"
         self._drawn: bool = False
         "Whether the map has been drawn"
+        self._lock = threading.Lock()
+        "Drawing and saving may run in different worker threads, the figure can only be rendered by one"
 
         self.fig: plt.Figure = None
         "The figure object of the map"
@@ -67,9 +201,70 @@ class Map:
         """
         Initialize the figure of the map.
         """
-        self.fig, self.ax = plt.subplots(figsize=(4, 6))
+        self.fig = plt.figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+        # let the axes fill the figure, so saving doesn't need a tight bbox pass to trim the margins
+        self.ax = self.fig.add_axes((0, 0, 1, 1))
         self.fig.patch.set_alpha(0)
         self.ax.set_axis_off()
+        zoom = self._zoom
+        min_lon, max_lon, min_lat, max_lat = self._extent
+        self.ax.set_xlim(min_lon, max_lon)
+        self.ax.set_ylim(min_lat, max_lat)
+        # the layers below only depend on the epicenter, so they are drawn once per figure,
+        # the zorder keeps the intensity layers between the towns and the country border
+        basemap, basemap_extent = _town_basemap(self._extent, zoom)
+        self.ax.imshow(basemap, extent=basemap_extent, interpolation="nearest", zorder=1)
+        COUNTRY_DATA.plot(ax=self.ax, edgecolor="black", facecolor="none", linewidth=0.64 / zoom, zorder=3)
+        # draw epicenter
+        self.ax.scatter(
+            self._eq.lon,
+            self._eq.lat,
+            marker="x",
+            color="red",
+            s=160 / zoom,
+            linewidths=2.5 / zoom,
+            zorder=4,
+        )
+        # add legend, anchored by its bottom corner inside of the axes,
+        # the axes fill the whole figure so any part outside of them is cut off when saving
+        if self._eq.lon > TAIWAN_CENTER.lon:
+            x = 0.98
+            align = 1
+        else:
+            x = 0.02
+            align = 0
+        legend = AnnotationBbox(
+            OffsetImage(legend_img, zoom=0.5),
+            (x, 0.02),
+            xycoords="axes fraction",
+            boxcoords="axes fraction",
+            box_alignment=(align, 0),
+            frameon=False,
+            zorder=6,
+        )
+        self.ax.add_artist(legend)
+
+        # the waves are hidden until they are drawn by :method:`draw_wave`
+        self.p_wave = Circle(
+            (self._eq.lon, self._eq.lat),
+            0,
+            color=P_WAVE_COLOR,
+            fill=False,
+            linewidth=1.5,
+            zorder=5,
+            visible=False,
+        )
+        self.s_wave = Circle(
+            (self._eq.lon, self._eq.lat),
+            0,
+            color=S_WAVE_COLOR,
+            fill=False,
+            linewidth=1.5,
+            zorder=5,
+            visible=False,
+        )
+        self.ax.add_patch(self.p_wave)
+        self.ax.add_patch(self.s_wave)
 
     @property
     def image(self) -> io.BytesIO:
@@ -84,56 +279,34 @@ class Map:
         """
         if self._eq._expected_intensity is None:
             raise RuntimeError("Intensity have not been calculated yet.")
-        if self.fig is None:
-            self.init_figure()
-        # map boundary
-        zoom = 1  # TODO: change zoom according to magnitude
-        mid_lon, mid_lat = (TAIWAN_CENTER.lon + self._eq.lon) / 2, (TAIWAN_CENTER.lat + self._eq.lat) / 2
-        lon_boundary, lat_boundary = 1.6 * zoom, 2.4 * zoom
-        min_lon, max_lon = mid_lon - lon_boundary, mid_lon + lon_boundary
-        min_lat, max_lat = mid_lat - lat_boundary, mid_lat + lat_boundary
-        self.ax.set_xlim(min_lon, max_lon)
-        self.ax.set_ylim(min_lat, max_lat)
-        TOWN_DATA.plot(ax=self.ax, facecolor="lightgrey", edgecolor="black", linewidth=0.22 / zoom)
-        # group geodata by quake intensity
-        region_patch: defaultdict[int, list[pd.Series | pd.DataFrame]] = defaultdict(list)
-        for code, region in self._eq._expected_intensity.items():
-            if region.intensity.value > 0:
-                region_patch[region.intensity.value].append(TOWN_RANGE[code])
-        # combine geodata and plot them
-        for intensity, gdfs in region_patch.items():
-            combined_gdf = gpd.GeoDataFrame(pd.concat(gdfs, ignore_index=True))
-            combined_gdf["geometry"] = combined_gdf.buffer(0.001)
-            gdf_merged = gpd.GeoDataFrame(geometry=[combined_gdf.unary_union])
-            gdf_merged.plot(ax=self.ax, color=INTENSITY_COLOR[intensity], edgecolor=None)
-
-        COUNTRY_DATA.plot(ax=self.ax, edgecolor="black", facecolor="none", linewidth=0.64 / zoom)
-        # draw epicenter
-        self.ax.scatter(
-            self._eq.lon,
-            self._eq.lat,
-            marker="x",
-            color="red",
-            s=160 / zoom,
-            linewidths=2.5 / zoom,
+        # skip the regions whose towns are all outside of the map boundary
+        min_lon, max_lon, min_lat, max_lat = self._extent
+        codes, bounds = _region_bounding_boxes()
+        inside = (
+            (bounds[:, 0] <= max_lon)
+            & (bounds[:, 2] >= min_lon)
+            & (bounds[:, 1] <= max_lat)
+            & (bounds[:, 3] >= min_lat)
         )
-        # add legend
-        if self._eq.lon > TAIWAN_CENTER.lon:
-            x = 1
-            align = 0.8
-        else:
-            x = 0
-            align = 0.2
-        self.ax.add_artist(
-            AnnotationBbox(
-                OffsetImage(legend_img, zoom=0.5),
-                (x, 0),
-                xycoords="axes fraction",
-                boxcoords="axes fraction",
-                box_alignment=(align, 0.2),
-                frameon=False,
+        visible = set(compress(codes, inside))
+        # collect the towns of every region with intensity, all of them are drawn as one collection
+        town_paths = _town_paths()
+        paths = []
+        levels = []
+        for code, intensity in self._eq._expected_intensity.intensity_values():
+            if intensity > 0 and code in visible:
+                towns = TOWN_RANGE[code].index
+                paths.extend(town_paths[index] for index in towns)
+                levels.extend([intensity] * len(towns))
+        colors = INTENSITY_RGBA[np.array(levels, dtype=np.intp)]
+        with self._lock:
+            if self.fig is None:
+                self.init_figure()
+            # the edges share the face color to close the seams between neighboring towns
+            intensity_layer = PathCollection(
+                paths, facecolors=colors, edgecolors=colors, linewidths=0.3, zorder=2
             )
-        )
+            self.ax.add_collection(intensity_layer, autolim=False)
         self._drawn = True
 
     def draw_wave(self, time: float, waves: str = "all"):
@@ -154,38 +327,39 @@ class Map:
 
         p_dis, s_dis = self._eq._model.get_arrival_distance(time)
 
+        # the circles are created with the figure, only their radius changes between frames
         if "p" in waves:
-            if self.p_wave is not None:
-                self.p_wave.remove()
-            self.p_wave = plt.Circle(
-                (self._eq.lon, self._eq.lat),
-                p_dis,
-                color=P_WAVE_COLOR,
-                fill=False,
-                linewidth=1.5,
-            )
-            self.ax.add_patch(self.p_wave)
+            self.p_wave.set_radius(p_dis)
+            self.p_wave.set_visible(True)
 
         if "s" in waves:
-            if self.s_wave is not None:
-                self.s_wave.remove()
-            self.s_wave = plt.Circle(
-                (self._eq.lon, self._eq.lat),
-                s_dis,
-                color=S_WAVE_COLOR,
-                fill=False,
-                linewidth=1.5,
-            )
-            self.ax.add_patch(self.s_wave)
+            self.s_wave.set_radius(s_dis)
+            self.s_wave.set_visible(True)
+
+    def save(self) -> io.BytesIO:
+        """
+        Save the map as a PNG image.
 
-    def save(self):
+        :return: The PNG image.
+        :rtype: io.BytesIO
+        """
         if self.fig is None:
             raise RuntimeError("Map have not been initialized yet.")
         if not self._drawn:
             warnings.warn("Map have not been drawn yet, it will be empty.")
 
         _map = io.BytesIO()
-        self.fig.savefig(_map, format="png", bbox_inches="tight")
+        with self._lock:
+            self.fig.canvas.print_png(_map, pil_kwargs=PNG_OPTIONS)
         _map.seek(0)
         self._image = _map
         return self._image
+
+    async def save_async(self) -> io.BytesIO:
+        """
+        Save the map as a PNG image in a worker thread, so the event loop is not blocked by rendering it.
+
+        :return: The PNG image.
+        :rtype: io.BytesIO
+        """
+        return await asyncio.get_running_loop().run_in_executor(_SAVE_EXECUTOR, self.save)
@@ -5,7 +5,9 @@ Reference: https://github.com/ExpTechTW/TREM-tauri/blob/main/src/scripts/helper/
 """
 
 import math
+from collections.abc import Iterator, Mapping, Sequence
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import TYPE_CHECKING, OrderedDict
 
 import numpy as np
@@ -13,7 +15,17 @@ from obspy.taup import tau
 from scipy.interpolate import interp1d
 
 from ..utils import MISSING
-from .location import REGIONS, Location, RegionLocation
+from .location import (
+    REGION_CODES,
+    REGION_COS_LAT,
+    REGION_LAT_RAD,
+    REGION_LON_RAD,
+    REGION_SITE_EFFECT,
+    REGIONS,
+    Location,
+    RegionLocation,
+    region_arrays,
+)
 
 if TYPE_CHECKING:
     from .eew import EarthquakeData
@@ -33,7 +45,6 @@ INTENSITY_DISPLAY: dict[int, str] = {
 }
 
 SEISMIC_MODEL = tau.TauPyModel(cache=OrderedDict())
-wave_model_cache: dict[int, "WaveModel"] = {}
 
 
 class WaveModel:
@@ -81,6 +92,20 @@ class WaveModel:
             float(self._s_travel_time_interp_func(distance)),
         )
 
+    def get_travel_times(self, distances: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the P and S waves travel times of the earthquake in seconds for multiple distances at once.
+
+        :param distances: The distances in radians.
+        :type distances: np.ndarray
+        :return: P and S waves travel times in seconds.
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        return (
+            self._p_travel_time_interp_func(distances),
+            self._s_travel_time_interp_func(distances),
+        )
+
     def get_arrival_distance(self, time: float) -> tuple[float, float]:
         """
         Get the P and S waves arrival distances of the earthquake in degrees.
@@ -96,6 +121,7 @@ class WaveModel:
         )
 
 
+@lru_cache(maxsize=256)
 def get_wave_model(depth: float) -> WaveModel:
     """
     Get the wave model for the given depth.
@@ -105,10 +131,6 @@ def get_wave_model(depth: float) -> WaveModel:
     :return: The wave model.
     :rtype: WaveModel
     """
-    cache = wave_model_cache.get(depth)
-    if cache is not None:
-        return cache
-
     deg = []
     p_time = []
     s_time = []
@@ -120,9 +142,7 @@ def get_wave_model(depth: float) -> WaveModel:
             deg.append(i)
             p_time.append(arrivals[0].time)
             s_time.append(arrivals[1].time)
-    model = WaveModel(np.array(deg), np.array(p_time), np.array(s_time))
-    wave_model_cache[depth] = model
-    return model
+    return WaveModel(np.array(deg), np.array(p_time), np.array(s_time))
 
 
 # pre fill wave model cache
@@ -268,6 +288,8 @@ class RegionExpectedIntensity:
     Represents a region expected intensity.
     """
 
+    __slots__ = ("_region", "_intensity", "_distance")
+
     def __init__(self, region: RegionLocation, intensity: Intensity, distance: Distance) -> None:
         """
         Initialize the region expected intensity instance.
@@ -308,52 +330,144 @@ class RegionExpectedIntensity:
         return f"RegionExpectedIntensity({self._region}, {self._intensity}, {self._distance.s_arrival_time})"
 
 
-class RegionExpectedIntensities(dict):
+class RegionExpectedIntensities(Mapping):
     """
     Represents a dict like object of expected intensity for each region returned by :method:`calculate_expected_intensity_and_travel_time`.
+    The values are kept as plain floats, the objects of a region are only created when it is accessed.
     """
 
-    def __init__(self, intensities: dict[int, RegionExpectedIntensity]):
+    __slots__ = ("_regions", "_positions", "_values", "_levels", "_time", "_cache")
+
+    def __init__(
+        self,
+        regions: Sequence[RegionLocation],
+        positions: dict[int, int],
+        values: tuple[tuple[float, ...], ...],
+        levels: np.ndarray,
+        time: datetime,
+    ):
         """
         Initialize the region expected intensities instance.
 
-        :param intensities: The intensities.
-        :type intensities: dict[int, RegionExpectedIntensity]
-        """
-        super(RegionExpectedIntensities, self).__init__()
-        self.update(intensities)
+        :param regions: The calculated regions.
+        :type regions: Sequence[RegionLocation]
+        :param positions: The position of each region code in `regions`.
+        :type positions: dict[int, int]
+        :param values: The intensities, distances in km and degrees, P and S travel times of the regions.
+        :type values: tuple[tuple[float, ...], ...]
+        :param levels: The rounded intensities of the regions.
+        :type levels: np.ndarray
+        :param time: The origin time of the earthquake.
+        :type time: datetime
+        """
+        self._regions = regions
+        self._positions = positions
+        self._values = values
+        self._levels = levels
+        self._time = time
+        self._cache: dict[int, RegionExpectedIntensity] = {}
 
     def __getitem__(self, key: int) -> RegionExpectedIntensity:
-        return super().__getitem__(key)
+        intensity = self._cache.get(key)
+        if intensity is None:
+            index = self._positions[key]
+            _intensity, km, degrees, p_travel, s_travel = (values[index] for values in self._values)
+            intensity = self._cache[key] = RegionExpectedIntensity(
+                self._regions[index],
+                Intensity(_intensity),
+                Distance(
+                    km,
+                    degrees,
+                    self._time + timedelta(seconds=p_travel),
+                    self._time + timedelta(seconds=s_travel),
+                    p_travel,
+                    s_travel,
+                ),
+            )
+        return intensity
 
     def get(self, key: int, default=None) -> RegionExpectedIntensity:
-        return super().get(key, default)
+        return self[key] if key in self._positions else default
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._positions
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def float_intensities(self, codes: Sequence[int]) -> np.ndarray:
+        """
+        Get the unrounded intensities of the regions without creating their objects.
+
+        :param codes: The region codes.
+        :type codes: Sequence[int]
+        :return: The intensity of each region, `-inf` for the regions not calculated.
+        :rtype: np.ndarray
+        """
+        positions = self._positions
+        intensities = self._values[0]
+        return np.fromiter(
+            (intensities[i] if (i := positions.get(code)) is not None else -math.inf for code in codes),
+            dtype=np.float64,
+            count=len(codes),
+        )
+
+    def intensity_values(self) -> Iterator[tuple[int, int]]:
+        """
+        Iterate the region codes and their rounded intensities without creating their objects.
+
+        :return: The iterator of (region code, intensity value).
+        :rtype: Iterator[tuple[int, int]]
+        """
+        return zip(self._positions, self._levels.tolist())
 
 
-def _calculate_distance(p1: Location, p2: Location) -> float:
+def _calculate_distance(p1: Location, lons: np.ndarray, lats: np.ndarray, cos_lats: np.ndarray) -> np.ndarray:
     """
-    Calculate the distance between two points on the Earth's surface.
+    Calculate the distances between a point and multiple points on the Earth's surface.
 
     :param p1: The location object.
     :type p1: Location
-    :param p2: The location object.
-    :type p2: Location
-    :return: The distance between the two points in radians.
-    :rtype: float
+    :param lons: The longitudes of the other points in radians.
+    :type lons: np.ndarray
+    :param lats: The latitudes of the other points in radians.
+    :type lats: np.ndarray
+    :param cos_lats: The cosines of the latitudes of the other points.
+    :type cos_lats: np.ndarray
+    :return: The distances between the point and each other point in radians.
+    :rtype: np.ndarray
     """
     # haversine formula
     lon1 = math.radians(p1.lon)
     lat1 = math.radians(p1.lat)
-    lon2 = math.radians(p2.lon)
-    lat2 = math.radians(p2.lat)
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
+    dlon = lons - lon1
+    dlat = lats - lat1
 
-    a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * cos_lats * np.sin(dlon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
     return c
 
 
+def _round_intensities(intensities: np.ndarray) -> np.ndarray:
+    """
+    Round the floating-point intensity values to integers at once, the same as :func:`round_intensity`.
+
+    :param intensities: Floating-point intensity values.
+    :type intensities: np.ndarray
+    :return: Rounded intensity values.
+    :rtype: np.ndarray
+    """
+    # numpy rounds half to even like the built-in round, the levels above 4.5 are split by the bins
+    return np.where(
+        intensities < 4.5,
+        np.round(np.maximum(intensities, 0)),
+        np.digitize(intensities, (5, 5.5, 6, 6.5)) + 5,
+    ).astype(np.int8)
+
+
 def round_intensity(intensity: float) -> int:
     """
     Round the floating-point intensity value to the nearest integer.
@@ -380,44 +494,117 @@ def round_intensity(intensity: float) -> int:
 
 
 def _calculate_intensity(
-    hypocenter_distance: float,
+    hypocenter_distance: np.ndarray,
     magnitude: float,
     depth: int,
-    site_effect: float = 1.751,
-) -> float:
+    site_effect: np.ndarray,
+) -> np.ndarray:
     """
-    Calculate the intensity of the earthquake of a given distance.
+    Calculate the intensities of the earthquake of the given distances.
 
-    :param hypocenter_distance: Actual distance from the hypocenter in kilometers.
-    :type hypocenter_distance: float
+    :param hypocenter_distance: Actual distances from the hypocenter in kilometers.
+    :type hypocenter_distance: np.ndarray
     :param magnitude: Magnitude of the earthquake.
     :type magnitude: float
     :param depth: Depth of the earthquake in kilometers.
     :type depth: int
-    :param site_effect: Site effect factor, default is 1.751.
-    :type site_effect: float
-    :return: Estimated intensity.
-    :rtype: float
+    :param site_effect: Site effect factors of each distance.
+    :type site_effect: np.ndarray
+    :return: Estimated intensities.
+    :rtype: np.ndarray
     """
-    pga = 1.657 * math.exp(1.533 * magnitude) * hypocenter_distance**-1.607 * (site_effect or 1.751)
-    i = 2 * math.log10(pga) + 0.7
-
-    if i > 3:
-        long = 10 ** (0.5 * magnitude - 1.85) / 2
-        x = max(hypocenter_distance - long, 3)
-        gpv600 = 10 ** (
-            0.58 * magnitude
-            + 0.0038 * depth
-            - 1.29
-            - math.log10(x + 0.0028 * 10 ** (0.5 * magnitude))
-            - 0.002 * x
-        )
-        arv = 1.0
-        pgv400 = gpv600 * 1.31
-        pgv = pgv400 * arv
-        i = 2.68 + 1.72 * math.log10(pgv)
+    pga = 1.657 * math.exp(1.533 * magnitude) * hypocenter_distance**-1.607 * site_effect
+    i = 2 * np.log10(pga) + 0.7
 
-    return i
+    # the pgv based formula is used instead where the pga based intensity is above 3
+    long = 10 ** (0.5 * magnitude - 1.85) / 2
+    x = np.maximum(hypocenter_distance - long, 3)
+    gpv600 = 10 ** (
+        0.58 * magnitude + 0.0038 * depth - 1.29 - np.log10(x + 0.0028 * 10 ** (0.5 * magnitude)) - 0.002 * x
+    )
+    arv = 1.0
+    pgv400 = gpv600 * 1.31
+    pgv = pgv400 * arv
+    return np.where(i > 3, 2.68 + 1.72 * np.log10(pgv), i)
+
+
+_REGION_LIST: list[RegionLocation] = list(REGIONS.values())
+_REGION_POSITIONS: dict[int, int] = {code: index for index, code in enumerate(REGION_CODES)}
+
+
+def _calculate_values(
+    epicenter: Location,
+    depth: float,
+    magnitude: float,
+    lons: np.ndarray,
+    lats: np.ndarray,
+    cos_lats: np.ndarray,
+    site_effects: np.ndarray,
+) -> tuple[tuple[tuple[float, ...], ...], np.ndarray]:
+    """
+    Calculate the expected values of the earthquake in the given regions at once with numpy.
+
+    :param epicenter: The epicenter of the earthquake.
+    :type epicenter: Location
+    :param depth: The depth of the earthquake in kilometers.
+    :type depth: float
+    :param magnitude: The magnitude of the earthquake.
+    :type magnitude: float
+    :param lons: The longitudes of the regions in radians.
+    :type lons: np.ndarray
+    :param lats: The latitudes of the regions in radians.
+    :type lats: np.ndarray
+    :param cos_lats: The cosines of the latitudes of the regions.
+    :type cos_lats: np.ndarray
+    :param site_effects: The site effect factors of the regions.
+    :type site_effects: np.ndarray
+    :return: The intensities, distances in km and degrees, P and S travel times of the regions,
+        and the rounded intensities as an int8 array.
+    :rtype: tuple[tuple[tuple[float, ...], ...], np.ndarray]
+    """
+    distance_in_radians = _calculate_distance(epicenter, lons, lats, cos_lats)
+    distance_in_degrees = np.degrees(distance_in_radians)
+    real_distance_in_km = np.sqrt((distance_in_radians * EARTH_RADIUS) ** 2 + depth**2)
+    intensity = _calculate_intensity(real_distance_in_km, magnitude, depth, site_effects)
+    p_travel, s_travel = get_wave_model(depth).get_travel_times(distance_in_radians)
+    values = tuple(
+        tuple(values.tolist())
+        for values in (intensity, real_distance_in_km, distance_in_degrees, p_travel, s_travel)
+    )
+    levels = _round_intensities(intensity)
+    # the results may be cached and shared, so they must never be modified
+    levels.setflags(write=False)
+    return values, levels
+
+
+@lru_cache(maxsize=128)
+def _calculate_region_values(
+    lon: float, lat: float, depth: float, magnitude: float
+) -> tuple[tuple[tuple[float, ...], ...], np.ndarray]:
+    """
+    Calculate the expected values of the earthquake in all regions.
+    The serial updates of an earthquake usually repeat the same parameters, so the results are cached.
+
+    :param lon: The longitude of the epicenter.
+    :type lon: float
+    :param lat: The latitude of the epicenter.
+    :type lat: float
+    :param depth: The depth of the earthquake in kilometers.
+    :type depth: float
+    :param magnitude: The magnitude of the earthquake.
+    :type magnitude: float
+    :return: The values of `REGIONS`, the same as :func:`_calculate_values`.
+    :rtype: tuple[tuple[tuple[float, ...], ...], np.ndarray]
+    """
+    return _calculate_values(
+        Location(lon, lat),
+        depth,
+        magnitude,
+        REGION_LON_RAD,
+        REGION_LAT_RAD,
+        REGION_COS_LAT,
+        REGION_SITE_EFFECT,
+    )
 
 
 def calculate_expected_intensity_and_travel_time(
@@ -434,31 +621,18 @@ def calculate_expected_intensity_and_travel_time(
     :rtype: RegionExpectedIntensities
     """
 
-    _expected_intensity = {}
-    squared_depth = earthquake.depth**2
-
-    for region in regions or REGIONS.values():
-        distance_in_radians = _calculate_distance(earthquake, region)
-        distance_in_degrees = math.degrees(distance_in_radians)
-        real_distance_in_km = math.sqrt((distance_in_radians * EARTH_RADIUS) ** 2 + squared_depth)
-        intensity = _calculate_intensity(
-            real_distance_in_km, earthquake.mag, earthquake.depth, region.side_effect
+    if regions:
+        lons, lats, site_effects = region_arrays(regions)
+        lons, lats = np.radians(lons), np.radians(lats)
+        values, levels = _calculate_values(
+            earthquake, earthquake.depth, earthquake.mag, lons, lats, np.cos(lats), site_effects
         )
-        p_travel, s_travel = earthquake.wave_model.get_travel_time(distance_in_radians)
-
-        _expected_intensity[region.code] = RegionExpectedIntensity(
-            region,
-            Intensity(intensity),
-            Distance(
-                real_distance_in_km,
-                distance_in_degrees,
-                earthquake.time + timedelta(seconds=p_travel),
-                earthquake.time + timedelta(seconds=s_travel),
-                p_travel,
-                s_travel,
-            ),
+        positions = {region.code: index for index, region in enumerate(regions)}
+    else:
+        regions = _REGION_LIST
+        values, levels = _calculate_region_values(
+            earthquake.lon, earthquake.lat, earthquake.depth, earthquake.mag
         )
+        positions = _REGION_POSITIONS
 
-    intensities = RegionExpectedIntensities(_expected_intensity)
-
-    return intensities
+    return RegionExpectedIntensities(regions, positions, values, levels, earthquake.time)
@@ -1,5 +1,12 @@
+import asyncio
+import sys
 from typing import Any
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class Missing:
     """
@@ -23,3 +30,36 @@ class Missing:
 
 
 MISSING: Any = Missing()
+
+
+def install_uvloop() -> bool:
+    """
+    Set uvloop as the event loop policy if it is available.
+    This must be called before the event loop is created.
+
+    :return: Whether uvloop is used.
+    :rtype: bool
+    """
+    if sys.platform == "win32":
+        # uvloop does not support Windows
+        return False
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+if orjson is not None:
+
+    def json_dumps(obj: Any) -> str:
+        """Serialize an object to a JSON string, using orjson if available."""
+        return orjson.dumps(obj).decode()
+
+    json_loads = orjson.loads
+else:
+    import json
+
+    json_dumps = json.dumps
+    json_loads = json.loads